@@ -1,7 +1,7 @@
 # main.py - robust ticket bot with modal compatibility fallback
 # - Tries to use modal TextInput (ui.TextInput or ui.InputText)
 # - If not present, falls back to slash commands for settings (no crash)
-# - Render-ready (Flask keep-alive), autclose, transcripts, notify role, 1-ticket-per-user
+# - Render-ready (aiohttp keep-alive), autclose, transcripts, notify role, 1-ticket-per-user
 # - Thoughtfully handled to avoid import crashes on different py-cord builds
 
 import os
@@ -10,17 +10,34 @@ os.environ["DISCORD_DISABLE_VOICE"] = "1"  # must run before importing discord i
 from dotenv import load_dotenv
 load_dotenv()
 
-from threading import Thread
-from flask import Flask
-import json, io, asyncio, datetime
-from datetime import timedelta
+# checked before the heavy imports below so a misconfigured deploy fails immediately
+TOKEN = os.getenv("DISCORD_TOKEN")
+if __name__ == "__main__" and not TOKEN:
+    raise RuntimeError("DISCORD_TOKEN not set in environment.")
+
+import json, io, asyncio, re, time, threading, heapq, functools, gzip, atexit
 from typing import List, Optional
 
+# orjson parses/serializes in C and emits bytes directly; stdlib json is the fallback
+try:
+    import orjson
+    _json_loads = orjson.loads
+    def _json_dumps(obj) -> bytes: return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _json_loads = json.loads  # accepts bytes too
+    def _json_dumps(obj) -> bytes: return json.dumps(obj, indent=2).encode("utf-8")
+
+import aiofiles, aiofiles.os
 import discord
+from aiohttp import web
 from discord import Embed, File
 from discord.ui import View, Button, Modal
 from discord import ui
 
+# embed colors are fixed, so build each Color once
+_CLR_GREEN = discord.Color.green(); _CLR_RED = discord.Color.red(); _CLR_ORANGE = discord.Color.orange()
+_CLR_BLURPLE = discord.Color.blurple(); _CLR_DGRAY = discord.Color.dark_gray()
+
 # ---------- Compatibility: find TextInput / InputText ----------
 # Try common names and locations across py-cord builds.
 TextInput = None
@@ -44,25 +61,32 @@ TextStyle = getattr(ui, "TextStyle", None) or getattr(discord, "TextStyle", None
 print("Pycord version:", getattr(discord, "__version__", "unknown"))
 print("Modal TextInput resolved:", bool(TextInput), "TextStyle resolved:", bool(TextStyle))
 
-# ---------- Flask keep-alive ----------
-app = Flask("ticket_bot_keepalive")
-@app.route("/")
-def home():
-    return "✅ Maxy Ticket Bot is running."
+# ---------- Keep-alive web server ----------
+# served by aiohttp on the bot's own event loop: no extra thread, no WSGI stack
+async def home(request: web.Request) -> web.Response:
+    return web.Response(text="✅ Maxy Ticket Bot is running.")
 
-def run_web():
-    port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False)
+_web_runner = None
 
-Thread(target=run_web).start()
+async def start_web():
+    global _web_runner
+    if _web_runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/", home)
+    _web_runner = web.AppRunner(app)
+    await _web_runner.setup()
+    port = int(os.environ.get("PORT", 8080))
+    await web.TCPSite(_web_runner, "0.0.0.0", port).start()
 
 # ---------- Config ----------
 CONFIG_FILE = "ticket_config.json"
+_DEFAULT_BUTTONS = ("Hosting", "Issues", "Suspension", "Other")
 DEFAULT_CONFIG = {
     "title": "Maxy Does Tickets – Support System",
     "description": "Need help? Open a ticket by clicking a button below!\nOur staff will assist you as soon as possible.",
     "image": None,
-    "buttons": ["Hosting", "Issues", "Suspension", "Other"],
+    "buttons": _DEFAULT_BUTTONS,
     "category_id": None,
     "panel_message_id": None,
     "panel_channel_id": None,
@@ -72,34 +96,148 @@ DEFAULT_CONFIG = {
     "autoclose_hours": 0
 }
 
-def load_config() -> dict:
-    if not os.path.isfile(CONFIG_FILE):
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(DEFAULT_CONFIG, f, indent=2)
-        return DEFAULT_CONFIG.copy()
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        try:
-            cfg = json.load(f)
-        except Exception:
-            cfg = DEFAULT_CONFIG.copy()
+# Parsed config is served from memory and only re-read when the file's mtime changes.
+# Callers get the live dict, so mutate it only right before saving.
+_CFG_CACHE = {"mtime": None, "data": None}
+_CFG_LOCK = threading.Lock()  # saves run in worker threads (asave_config)
+
+# modal placeholders, recomputed only when the cached config changes
+# (Discord rejects placeholders longer than 100 characters)
+_PLACEHOLDERS = {}
+
+def _refresh_placeholders(cfg: dict):
+    _PLACEHOLDERS["title"] = (cfg.get("title") or DEFAULT_CONFIG["title"])[:100]
+    _PLACEHOLDERS["creation_text"] = (cfg.get("creation_text") or DEFAULT_CONFIG["creation_text"])[:100]
+    _PLACEHOLDERS["category_id"] = str(cfg.get("category_id") or "0")
+    _PLACEHOLDERS["log_channel_id"] = str(cfg.get("log_channel_id") or "0")
+    _PLACEHOLDERS["autoclose_hours"] = str(cfg.get("autoclose_hours") or 0)
+
+def _parse_config(raw: bytes) -> dict:
+    try:
+        cfg = _json_loads(raw)
+    except Exception:
+        cfg = DEFAULT_CONFIG.copy()
     for k, v in DEFAULT_CONFIG.items():
         if k not in cfg:
             cfg[k] = v
+    # JSON gives a list; keep buttons immutable (and hashable for the panel view cache)
+    cfg["buttons"] = tuple(cfg["buttons"] or ())
     return cfg
 
-def save_config(cfg: dict):
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(cfg, f, indent=2)
+def _cache_config(mtime: int, cfg: dict):
+    # caller holds _CFG_LOCK
+    _CFG_CACHE["mtime"] = mtime
+    _CFG_CACHE["data"] = cfg
+    _refresh_placeholders(cfg)
 
-_config = load_config()
+def load_config() -> dict:
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        save_config(DEFAULT_CONFIG.copy())
+        return _CFG_CACHE["data"]
+    if mtime == _CFG_CACHE["mtime"]:
+        return _CFG_CACHE["data"]
+    with _CFG_LOCK:
+        # a save may have swapped the file in and refreshed the cache while we waited
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+        if mtime == _CFG_CACHE["mtime"]:
+            return _CFG_CACHE["data"]
+        with open(CONFIG_FILE, "rb") as f:
+            cfg = _parse_config(f.read())
+        _cache_config(mtime, cfg)
+        return cfg
+
+def save_config(cfg: dict):
+    # write a sibling temp file and swap it in, so a crash mid-write never leaves torn JSON
+    data = _json_dumps(cfg)  # serialize up front, then one write() call
+    tmp = CONFIG_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    # swap + cache refresh are one step for readers, so they never pair the new mtime with old data
+    with _CFG_LOCK:
+        os.replace(tmp, CONFIG_FILE)
+        _cache_config(os.stat(CONFIG_FILE).st_mtime_ns, cfg)
+
+# coroutine wrappers: disk I/O runs in a worker thread so a slow disk never stalls the gateway
+async def aload_config() -> dict:
+    try:
+        mtime = (await aiofiles.os.stat(CONFIG_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return await asyncio.to_thread(load_config)  # first run: writes the defaults
+    if mtime == _CFG_CACHE["mtime"]:
+        return _CFG_CACHE["data"]
+    async with aiofiles.open(CONFIG_FILE, "rb") as f:
+        cfg = _parse_config(await f.read())
+    with _CFG_LOCK:
+        if mtime == _CFG_CACHE["mtime"]:
+            return _CFG_CACHE["data"]
+        # only cache what we read if no save replaced the file in the meantime
+        if os.stat(CONFIG_FILE).st_mtime_ns == mtime:
+            _cache_config(mtime, cfg)
+            return cfg
+    return await asyncio.to_thread(load_config)
+
+# serializes concurrent saves from interaction handlers
+_save_lock = asyncio.Lock()
+
+async def asave_config(cfg: dict):
+    async with _save_lock:
+        await asyncio.to_thread(save_config, cfg)
+
+# Admin edits land in the cached dict immediately; the flusher writes them out
+# CONFIG_FLUSH_DELAY seconds after the first one, so edits within that window share one write.
+CONFIG_FLUSH_DELAY = 0.5
+_config_dirty = asyncio.Event()
+_flusher_task = None
+
+async def update_config(**changes):
+    cfg = await aload_config()
+    cfg.update(changes)
+    _refresh_placeholders(cfg)
+    _config_dirty.set()
+
+async def _config_flusher():
+    while True:
+        await _config_dirty.wait()
+        await asyncio.sleep(CONFIG_FLUSH_DELAY)
+        _config_dirty.clear()
+        try:
+            await asave_config(_CFG_CACHE["data"])
+        except Exception as e:
+            print("Config flush error:", e)
+            _config_dirty.set()
+
+def start_config_flusher():
+    global _flusher_task
+    if _flusher_task is None or _flusher_task.done():
+        _flusher_task = asyncio.create_task(_config_flusher())
+
+@atexit.register
+def _flush_config_at_exit():
+    # last-chance synchronous write for edits still inside the debounce window
+    if _config_dirty.is_set():
+        save_config(_CFG_CACHE["data"])
+
+load_config()  # warm the cache (creates the file on first run)
+
+# ---------- Event loop ----------
+# uvloop has to be in place before the bot is constructed: py-cord grabs its loop in Bot.__init__
+try:
+    import uvloop
+    asyncio.set_event_loop(uvloop.new_event_loop())
+except ImportError:
+    pass
 
 # ---------- Bot & intents ----------
 intents = discord.Intents.default()
 intents.message_content = True
-intents.members = True
 intents.guilds = True
-
-bot = discord.Bot(intents=intents)
+# no members intent: handlers only use interaction.user, which arrives with the interaction,
+# so skip the startup member chunking and don't keep a member cache around
+bot = discord.Bot(intents=intents, chunk_guilds_at_startup=False, member_cache_flags=discord.MemberCacheFlags.none())
 
 GUILD_ID = os.getenv("GUILD_ID")
 if GUILD_ID:
@@ -112,69 +250,168 @@ else:
 
 print("GUILD_IDS:", GUILD_IDS)
 
-def is_admin(user: discord.Member) -> bool:
+# optional extra staff roles (comma-separated ids) that count as admins for bot commands
+try:
+    ADMIN_ROLE_IDS = frozenset(int(x) for x in os.getenv("ADMIN_ROLE_IDS", "").split(",") if x.strip())
+except Exception:
+    ADMIN_ROLE_IDS = frozenset()
+
+def is_admin(interaction: discord.Interaction) -> bool:
     try:
-        return user.guild_permissions.administrator
+        if ADMIN_ROLE_IDS and not ADMIN_ROLE_IDS.isdisjoint(r.id for r in interaction.user.roles):
+            return True
+        # Discord sends the member's resolved permissions with the interaction,
+        # so this skips recomputing guild_permissions from the member's roles
+        return interaction.permissions.administrator
     except Exception:
         return False
 
+async def _ack(ctx: discord.ApplicationContext, content: Optional[str] = None, **kwargs):
+    # every command answers exactly once, ephemerally, so skip ctx.respond's followup dispatch
+    await ctx.interaction.response.send_message(content, ephemeral=True, **kwargs)
+
+# keep references to fire-and-forget tasks so they aren't garbage-collected mid-run
+_BG_TASKS = set()
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    _BG_TASKS.add(task)
+    task.add_done_callback(_BG_TASKS.discard)
+    return task
+
 # ---------- Ticket panel & ticket creation ----------
+# guild id -> {user id -> open ticket channel id}; rebuilt from channel topics in on_ready
+OPEN_TICKETS = {}
+
+_ID_RE = re.compile(r"ID:\s*(\d+)")
+
+def topic_owner_id(topic: Optional[str]) -> Optional[int]:
+    m = _ID_RE.search(topic or "")
+    return int(m.group(1)) if m else None
+
+def index_open_tickets():
+    OPEN_TICKETS.clear()
+    for guild in bot.guilds:
+        for ch in guild.text_channels:
+            owner_id = topic_owner_id(ch.topic)
+            if owner_id:
+                OPEN_TICKETS.setdefault(guild.id, {})[owner_id] = ch.id
+
+# anything Discord wouldn't keep in a channel name (spaces, emoji, punctuation) collapses to one dash
+_NAME_RE = re.compile(r"[^a-z0-9-]+")
+
+# overwrites are only read when the create payload is built, so one instance can be shared
+_HIDDEN_OW = discord.PermissionOverwrite(view_channel=False)
+_TICKET_ACCESS_OW = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
+
+# guild id -> roles with Administrator; dropped whenever a role is created, edited or deleted
+ADMIN_ROLES = {}
+
+def get_admin_roles(guild: discord.Guild) -> List[discord.Role]:
+    roles = ADMIN_ROLES.get(guild.id)
+    if roles is None:
+        roles = ADMIN_ROLES[guild.id] = [r for r in guild.roles if r.permissions.administrator]
+    return roles
+
+# guild id -> @everyone + admin role overwrites; each ticket copies it and adds its owner
+_GUILD_BASE_OVERWRITES = {}
+
+def base_overwrites(guild: discord.Guild) -> dict:
+    ovw = _GUILD_BASE_OVERWRITES.get(guild.id)
+    if ovw is None:
+        ovw = {guild.default_role: _HIDDEN_OW}
+        ovw.update(dict.fromkeys(get_admin_roles(guild), _TICKET_ACCESS_OW))
+        _GUILD_BASE_OVERWRITES[guild.id] = ovw
+    return ovw
+
+def invalidate_role_caches(guild_id: int):
+    ADMIN_ROLES.pop(guild_id, None)
+    _GUILD_BASE_OVERWRITES.pop(guild_id, None)
+
 class TicketButton(Button):
     def __init__(self, label: str, style: discord.ButtonStyle = discord.ButtonStyle.primary):
-        super().__init__(label=label, style=style)
+        # stable custom_id so panels keep working after a restart (see on_ready)
+        super().__init__(label=label, style=style, custom_id=f"ticket_open_{label}")
 
     async def callback(self, interaction: discord.Interaction):
         # acknowledge quickly
         await interaction.response.defer(ephemeral=True)
         await handle_ticket_button(interaction, self.label)
 
+# first matching keyword wins; everything else is primary
+_STYLE_RULES = (
+    ("suspension", discord.ButtonStyle.danger),
+    ("suspend", discord.ButtonStyle.danger),
+    ("other", discord.ButtonStyle.secondary),
+)
+
+def _style_for(name: str) -> discord.ButtonStyle:
+    low = name.lower()
+    return next((style for kw, style in _STYLE_RULES if kw in low), discord.ButtonStyle.primary)
+
+@functools.lru_cache(maxsize=8)
+def compute_styles(buttons: tuple) -> tuple:
+    # (label, style) pairs, classified once per distinct button set
+    return tuple((name, _style_for(name)) for name in dict.fromkeys(buttons))  # custom_ids must be unique within a view
+
 class TicketPanelView(View):
     def __init__(self, buttons: List[str]):
         super().__init__(timeout=None)
-        for name in buttons:
-            style = discord.ButtonStyle.primary
-            ln = name.lower()
-            if "suspend" in ln or "suspension" in ln:
-                style = discord.ButtonStyle.danger
-            elif "other" in ln:
-                style = discord.ButtonStyle.secondary
+        for name, style in compute_styles(tuple(buttons)):
             self.add_item(TicketButton(label=name, style=style))
 
+# the panel view is persistent (timeout=None, stable custom_ids), so one instance can back
+# every post of the same button set; a changed button list simply misses the key
+_panel_view_cache = None  # (buttons tuple, TicketPanelView)
+
+def panel_view(buttons: List[str]) -> TicketPanelView:
+    global _panel_view_cache
+    key = tuple(buttons)
+    if _panel_view_cache is None or _panel_view_cache[0] != key:
+        _panel_view_cache = (key, TicketPanelView(buttons=key))
+    return _panel_view_cache[1]
+
 class CloseTicketButton(Button):
     def __init__(self, label: str = "Close Ticket"):
-        super().__init__(label=label, style=discord.ButtonStyle.danger)
+        super().__init__(label=label, style=discord.ButtonStyle.danger, custom_id="ticket_close_btn")
 
     async def callback(self, interaction: discord.Interaction):
-        if not is_admin(interaction.user):
+        if not is_admin(interaction):
             await interaction.response.send_message("Only administrators can close tickets.", ephemeral=True)
             return
         await interaction.response.send_message("Deleting the ticket in a few seconds...", ephemeral=False)
-        await handle_close(interaction)
+        if interaction.channel is not None:
+            spawn(handle_close(interaction.channel, interaction.user))
+
+_CLOSE_VIEW = None
 
 def make_close_view() -> View:
-    v = View(timeout=None)
-    v.add_item(CloseTicketButton())
-    return v
+    # one shared persistent view; built lazily because View() needs a running event loop
+    global _CLOSE_VIEW
+    if _CLOSE_VIEW is None:
+        _CLOSE_VIEW = View(timeout=None)
+        _CLOSE_VIEW.add_item(CloseTicketButton())
+    return _CLOSE_VIEW
 
 async def handle_ticket_button(interaction: discord.Interaction, issue_type: str):
     guild = interaction.guild
     member = interaction.user
-    cfg = load_config()
+    cfg = await aload_config()
 
     # one ticket per user
-    for ch in guild.text_channels:
-        try:
-            if ch.topic and str(member.id) in ch.topic:
-                await interaction.followup.send(f"You already have an open ticket: {ch.mention}", ephemeral=True)
-                return
-        except Exception:
-            continue
+    existing = OPEN_TICKETS.get(guild.id, {}).get(member.id)
+    if existing is not None:
+        ch = guild.get_channel(existing)
+        if ch is not None:
+            await interaction.followup.send(f"You already have an open ticket: {ch.mention}", ephemeral=True)
+            return
 
-    safe = member.name.lower().replace(" ", "-")[:50]
+    safe = _NAME_RE.sub("-", member.name.lower())[:50].strip("-") or "user"
     base = f"ticket-{safe}"
     name = base
     i = 1
-    while discord.utils.get(guild.text_channels, name=name) is not None:
+    taken = {c.name for c in guild.text_channels}
+    while name in taken:
         i += 1
         name = f"{base}-{i}"
 
@@ -184,14 +421,8 @@ async def handle_ticket_button(interaction: discord.Interaction, issue_type: str
         if category is None or not isinstance(category, discord.CategoryChannel):
             category = None
 
-    overwrites = {guild.default_role: discord.PermissionOverwrite(view_channel=False)}
-    overwrites[member] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
-    for role in guild.roles:
-        try:
-            if role.permissions.administrator:
-                overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
-        except Exception:
-            pass
+    overwrites = dict(base_overwrites(guild))
+    overwrites[member] = _TICKET_ACCESS_OW
 
     try:
         created = await guild.create_text_channel(
@@ -207,172 +438,331 @@ async def handle_ticket_button(interaction: discord.Interaction, issue_type: str
     except Exception as e:
         await interaction.followup.send(f"Failed to create ticket channel: {e}", ephemeral=True)
         return
+    OPEN_TICKETS.setdefault(guild.id, {})[member.id] = created.id
 
+    now = discord.utils.utcnow()  # shared by the intro and log embeds
     embed = Embed(
         title=f"Ticket — {issue_type}",
         description=(f"Hello {member.mention},\n\n{cfg.get('creation_text')}\n\n**Issue:** {issue_type}\n\nMade by Max ❤️"),
-        color=discord.Color.blurple(),
-        timestamp=datetime.datetime.utcnow()
+        color=_CLR_BLURPLE,
+        timestamp=now
     )
     if cfg.get("image"):
-        try:
-            embed.set_thumbnail(url=cfg["image"])
-        except Exception:
-            pass
+        embed.set_thumbnail(url=cfg["image"])  # set_image already validated the URL
 
-    try:
-        await created.send(content=f"{member.mention}", embed=embed, view=make_close_view())
-    except Exception:
-        pass
+    role = guild.get_role(cfg["notify_role_id"]) if cfg.get("notify_role_id") else None
 
-    # notify role
-    if cfg.get("notify_role_id"):
-        role = guild.get_role(cfg["notify_role_id"])
+    async def _intro():
+        # same channel, so the intro and the role ping stay in order
+        await created.send(content=f"{member.mention}", embed=embed, view=make_close_view())
         if role:
-            try:
-                await created.send(f"{role.mention} New ticket opened: {created.mention}")
-            except Exception:
-                pass
+            await created.send(f"{role.mention} New ticket opened: {created.mention}")
+
+    sends = [interaction.followup.send(f"Your ticket has been created: {created.mention}", ephemeral=True), _intro()]
 
     # log
     if cfg.get("log_channel_id"):
         log_ch = guild.get_channel(cfg["log_channel_id"])
         if isinstance(log_ch, discord.TextChannel):
-            le = Embed(title="Ticket Created", color=discord.Color.green(), timestamp=datetime.datetime.utcnow())
+            le = Embed(title="Ticket Created", color=_CLR_GREEN, timestamp=now)
             le.add_field(name="User", value=f"{member} ({member.id})", inline=False)
             le.add_field(name="Issue", value=issue_type, inline=False)
             le.add_field(name="Channel", value=created.mention, inline=False)
-            try:
-                await log_ch.send(embed=le)
-            except Exception:
-                pass
+            sends.append(log_ch.send(embed=le))
 
-    await interaction.followup.send(f"Your ticket has been created: {created.mention}", ephemeral=True)
+    # confirmation, intro and log hit different endpoints, so none waits on another
+    for r in await asyncio.gather(*sends, return_exceptions=True):
+        if isinstance(r, Exception):
+            print("Ticket create send error:", r)
 
 # ---------- Close & transcript ----------
-async def handle_close(interaction: discord.Interaction):
-    channel = interaction.channel
-    if channel is None:
-        return
-    cfg = load_config()
-    lines = []
+# Log/DM sends share one semaphore so a burst of closes doesn't storm Discord into 429s.
+_log_sem = asyncio.Semaphore(5)
+
+async def send_limited(dest, **kwargs):
+    async with _log_sem:
+        try:
+            return await dest.send(**kwargs)
+        except discord.HTTPException as e:
+            if e.status != 429:
+                raise
+            await asyncio.sleep(float(e.response.headers.get("Retry-After", "1")))
+            if kwargs.get("file") is not None:
+                kwargs["file"].reset()
+            return await dest.send(**kwargs)
+
+async def resolve_user(guild: discord.Guild, user_id: int):
+    # cache first (users seen in interactions/messages); only fall back to a REST fetch for the rest
+    user = bot.get_user(user_id) or guild.get_member(user_id)
+    if user is None:
+        try:
+            user = await bot.fetch_user(user_id)
+        except discord.HTTPException:
+            user = None
+    return user
+
+# Transcripts are paged so a huge ticket can't balloon memory or exceed the upload cap.
+TRANSCRIPT_PAGE_SIZE = 500
+TRANSCRIPT_MAX_MESSAGES = 10_000  # also bounds the history REST calls per close
+TRANSCRIPT_MAX_BYTES = 24 * 1024 * 1024  # stay under Discord's 25 MB attachment limit
+# chat text compresses well; anything bigger than this is uploaded gzipped
+TRANSCRIPT_GZIP_OVER = 64_000
+
+async def build_transcript(channel: discord.TextChannel):
+    """Returns (transcript bytes, filename, message count it was truncated at or None)."""
+    # one BytesIO for the whole run: getvalue() and the per-upload BytesIO(tb) share its bytes
+    buf = io.BytesIO()
+    count = 0
+    truncated = None
+    after = None
     try:
-        async for msg in channel.history(limit=None, oldest_first=True):
-            ts = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            author = f"{msg.author} ({msg.author.id})"
-            content = msg.content or ""
-            attachments = " ".join(a.url for a in msg.attachments) if msg.attachments else ""
-            lines.append(f"[{ts}] {author}: {content} {attachments}")
+        while truncated is None:
+            fetched = 0
+            async for msg in channel.history(limit=TRANSCRIPT_PAGE_SIZE, after=after, oldest_first=True):
+                fetched += 1
+                after = msg
+                # one f-string per message; the attachment join only runs when there are any
+                att = (" " + " ".join(a.url for a in msg.attachments)) if msg.attachments else ""
+                line = f"[{msg.created_at:%Y-%m-%d %H:%M:%S}] {msg.author} ({msg.author.id}): {msg.content}{att}\n".encode("utf-8")
+                if count >= TRANSCRIPT_MAX_MESSAGES or buf.tell() + len(line) > TRANSCRIPT_MAX_BYTES:
+                    truncated = count
+                    break
+                buf.write(line)
+                count += 1
+            if fetched < TRANSCRIPT_PAGE_SIZE:
+                break
     except Exception:
-        lines.append("Failed to fetch history due to permissions.")
-
-    transcript = "\n".join(lines) if lines else "No messages."
-    tb = transcript.encode("utf-8")
+        buf.write(b"Failed to fetch history due to permissions.\n")
+    if truncated is not None:
+        buf.write(f"... transcript truncated at {truncated} messages ...\n".encode("utf-8"))
+    tb = buf.getvalue()
+    filename = f"transcript-{channel.name}.txt"
+    if len(tb) > TRANSCRIPT_GZIP_OVER:
+        tb = await asyncio.to_thread(gzip.compress, tb, 6)
+        return tb, filename + ".gz", truncated
+    return (tb or b"No messages."), filename, truncated
+
+async def handle_close(channel: discord.TextChannel, closed_by):
+    now = discord.utils.utcnow()
+    cfg = await aload_config()
+    owner_id = topic_owner_id(channel.topic)
+    tb, fname, truncated = await build_transcript(channel)
+
+    # the transcript is in memory, so the channel can go before the slower log/DM uploads
+    try:
+        await channel.delete(reason=f"Ticket closed by {closed_by}")
+    except discord.NotFound:
+        pass  # already deleted
+    except Exception as e:
+        # channel is still there, so keep it tracked as the owner's open ticket
+        print("Ticket close error:", e)
+        try:
+            await channel.send("Failed to close this ticket. Please try again.")
+        except Exception:
+            pass
+        return
+    OPEN_TICKETS.get(channel.guild.id, {}).pop(owner_id, None)
 
-    # send to log channel
-    if cfg.get("log_channel_id"):
+    async def _send_log():
+        if not cfg.get("log_channel_id"):
+            return
         lc = channel.guild.get_channel(cfg["log_channel_id"])
         if isinstance(lc, discord.TextChannel):
-            de = Embed(title="Ticket Closed & Deleted", color=discord.Color.red(), timestamp=datetime.datetime.utcnow())
+            de = Embed(title="Ticket Closed & Deleted", color=_CLR_RED, timestamp=now)
             de.add_field(name="Channel", value=channel.name, inline=False)
             if channel.topic:
                 de.add_field(name="Topic", value=channel.topic, inline=False)
+            if truncated is not None:
+                de.add_field(name="Transcript", value=f"Truncated at {truncated} messages", inline=False)
             try:
-                await lc.send(embed=de)
-                await lc.send(file=File(io.BytesIO(tb), filename=f"transcript-{channel.name}.txt"))
+                await send_limited(lc, embed=de, file=File(io.BytesIO(tb), filename=fname))
             except Exception:
                 pass
 
-    # DM ticket owner if possible
-    owner_id = None
-    if channel.topic and "ID:" in channel.topic:
-        try:
-            owner_id = int(channel.topic.split("ID:")[1].split(")")[0].strip())
-        except Exception:
-            owner_id = None
-    if owner_id:
-        try:
-            user = await bot.fetch_user(owner_id)
-            if user:
-                await user.send(content=f"Your ticket **{channel.name}** has been closed. Transcript attached.", file=File(io.BytesIO(tb), filename=f"transcript-{channel.name}.txt"))
-        except Exception:
-            pass
+    async def _dm_owner():
+        if owner_id:
+            try:
+                user = await resolve_user(channel.guild, owner_id)
+                if user:
+                    await send_limited(user, content=f"Your ticket **{channel.name}** has been closed. Transcript attached.", file=File(io.BytesIO(tb), filename=fname))
+            except Exception:
+                pass
 
-    try:
-        await channel.delete(reason=f"Ticket closed by {interaction.user}")
-    except Exception:
-        pass
+    await asyncio.gather(_send_log(), _dm_owner(), return_exceptions=True)
 
 # ---------- Auto-close background ----------
+# bounds how many expired tickets are being closed at the same time
+_autoclose_sem = asyncio.Semaphore(5)
+
+# tickets being auto-closed right now; on_message ignores the bot's own warning in these,
+# so a failed close keeps its retry slot instead of counting the warning as activity
+_CLOSING = set()
+
+async def _autoclose_one(channel: discord.TextChannel, cfg: dict) -> bool:
+    """Returns True once the channel is gone; False means the checker should retry later."""
+    async with _autoclose_sem:
+        _CLOSING.add(channel.id)
+        try:
+            await channel.send("🕐 No activity detected. Deleting the ticket in a few seconds...")
+            await asyncio.sleep(5)
+            # gather transcript and delete
+            await _auto_close_and_log(channel, cfg)
+            return True
+        except Exception as e:
+            print("Auto-close error:", e)
+            return False
+        finally:
+            _CLOSING.discard(channel.id)
+
+# Inactivity is tracked from message events instead of polling every ticket channel.
+# channel id -> epoch seconds of its latest message
+_LAST_ACTIVITY = {}
+# one (activity, channel id) entry per tracked ticket, ordered by oldest activity;
+# entries are refreshed lazily when they reach the front
+_ACTIVITY_HEAP = []
+# a failed auto-close is retried this many seconds later (the old polling interval)
+AUTOCLOSE_RETRY = 300
+
+def _compact_activity_heap():
+    # entries of channels that stopped being tracked (deleted, closed) are normally dropped when
+    # they reach the front; that never happens while auto-close is off, so prune them here
+    if len(_ACTIVITY_HEAP) > 2 * len(_LAST_ACTIVITY) + 64:
+        _ACTIVITY_HEAP[:] = [e for e in _ACTIVITY_HEAP if e[1] in _LAST_ACTIVITY]
+        heapq.heapify(_ACTIVITY_HEAP)
+
+def touch_ticket(channel_id: int, ts: float):
+    if channel_id not in _LAST_ACTIVITY:
+        heapq.heappush(_ACTIVITY_HEAP, (ts, channel_id))
+    _LAST_ACTIVITY[channel_id] = ts
+
+def track_ticket_channels():
+    for guild in bot.guilds:
+        for channel in guild.text_channels:
+            if channel.name.startswith("ticket-") and channel.last_message_id is not None:
+                # the last message's snowflake encodes its timestamp, so no history fetch is needed
+                touch_ticket(channel.id, discord.utils.snowflake_time(channel.last_message_id).timestamp())
+
+_autoclose_task = None
+
 async def auto_close_checker():
     await bot.wait_until_ready()
     while not bot.is_closed():
-        cfg = load_config()
+        cfg = await aload_config()
         hours = cfg.get("autoclose_hours", 0)
+        delay = 300  # also bounds how long a changed autoclose_hours takes to apply
+        _compact_activity_heap()
         if hours and hours > 0:
-            cutoff = datetime.datetime.utcnow() - timedelta(hours=hours)
-            for guild in bot.guilds:
-                for channel in guild.text_channels:
-                    if channel.name.startswith("ticket-"):
-                        try:
-                            last = None
-                            async for msg in channel.history(limit=1, oldest_first=False):
-                                last = msg
-                            if last and last.created_at.replace(tzinfo=None) < cutoff:
-                                try:
-                                    await channel.send("🕐 No activity detected. Deleting the ticket in a few seconds...")
-                                    await asyncio.sleep(5)
-                                    # gather transcript and delete
-                                    await _auto_close_and_log(channel, cfg)
-                                except Exception as e:
-                                    print("Auto-close error:", e)
-                        except Exception as e:
-                            print("Auto-close iteration error:", e)
-        await asyncio.sleep(300)
+            cutoff = time.time() - hours * 3600
+            expired = []
+            while _ACTIVITY_HEAP and _ACTIVITY_HEAP[0][0] < cutoff:
+                ts, cid = heapq.heappop(_ACTIVITY_HEAP)
+                last = _LAST_ACTIVITY.get(cid)
+                if last is None:
+                    continue
+                if last > ts:
+                    heapq.heappush(_ACTIVITY_HEAP, (last, cid))
+                    continue
+                channel = bot.get_channel(cid)
+                if isinstance(channel, discord.TextChannel) and channel.name.startswith("ticket-"):
+                    expired.append(channel)
+                else:
+                    del _LAST_ACTIVITY[cid]
+            # the channel stays tracked (with no heap entry) until its close succeeds
+            results = await asyncio.gather(*(_autoclose_one(ch, cfg) for ch in expired))
+            for ch, closed in zip(expired, results):
+                if closed:
+                    _LAST_ACTIVITY.pop(ch.id, None)
+                elif ch.id in _LAST_ACTIVITY:
+                    # keyed so it falls behind the cutoff again after AUTOCLOSE_RETRY seconds;
+                    # newer activity still wins through the lazy refresh above
+                    heapq.heappush(_ACTIVITY_HEAP, (time.time() - hours * 3600 + AUTOCLOSE_RETRY, ch.id))
+            if _ACTIVITY_HEAP:
+                delay = min(delay, max(1, _ACTIVITY_HEAP[0][0] - cutoff))
+        await asyncio.sleep(delay)
 
 async def _auto_close_and_log(channel: discord.TextChannel, cfg: dict):
-    lines = []
+    now = discord.utils.utcnow()
+    owner_id = topic_owner_id(channel.topic)
+    tb, fname, truncated = await build_transcript(channel)
     try:
-        async for m in channel.history(limit=None, oldest_first=True):
-            ts = m.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            author = f"{m.author} ({m.author.id})"
-            content = m.content or ""
-            attachments = " ".join(a.url for a in m.attachments) if m.attachments else ""
-            lines.append(f"[{ts}] {author}: {content} {attachments}")
-    except Exception:
-        lines.append("Failed to fetch history due to permissions.")
-    transcript = "\n".join(lines) if lines else "No messages."
-    tb = transcript.encode("utf-8")
-    if cfg.get("log_channel_id"):
+        await channel.delete(reason="Auto-closed due to inactivity")
+    except discord.NotFound:
+        pass  # already deleted; any other failure propagates so the checker retries
+    OPEN_TICKETS.get(channel.guild.id, {}).pop(owner_id, None)
+
+    async def _send_log():
+        if not cfg.get("log_channel_id"):
+            return
         lc = channel.guild.get_channel(cfg["log_channel_id"])
         if isinstance(lc, discord.TextChannel):
-            de = Embed(title="Ticket Auto-Closed (Inactivity)", color=discord.Color.orange(), timestamp=datetime.datetime.utcnow())
+            de = Embed(title="Ticket Auto-Closed (Inactivity)", color=_CLR_ORANGE, timestamp=now)
             de.add_field(name="Channel", value=channel.name, inline=False)
+            if truncated is not None:
+                de.add_field(name="Transcript", value=f"Truncated at {truncated} messages", inline=False)
             try:
-                await lc.send(embed=de)
-                await lc.send(file=File(io.BytesIO(tb), filename=f"transcript-{channel.name}.txt"))
+                await send_limited(lc, embed=de, file=File(io.BytesIO(tb), filename=fname))
             except Exception:
                 pass
-    # DM owner
-    owner_id = None
-    if channel.topic and "ID:" in channel.topic:
-        try:
-            owner_id = int(channel.topic.split("ID:")[1].split(")")[0].strip())
-        except Exception:
-            owner_id = None
-    if owner_id:
-        try:
-            u = await bot.fetch_user(owner_id)
-            if u:
-                await u.send(content=f"Your ticket **{channel.name}** was auto-closed due to inactivity. Transcript attached.", file=File(io.BytesIO(tb), filename=f"transcript-{channel.name}.txt"))
-        except Exception:
-            pass
-    try:
-        await channel.delete(reason="Auto-closed due to inactivity")
-    except Exception:
-        pass
+
+    async def _dm_owner():
+        if owner_id:
+            try:
+                u = await resolve_user(channel.guild, owner_id)
+                if u:
+                    await send_limited(u, content=f"Your ticket **{channel.name}** was auto-closed due to inactivity. Transcript attached.", file=File(io.BytesIO(tb), filename=fname))
+            except Exception:
+                pass
+
+    # log and DM uploads share the same transcript bytes and run side by side
+    await asyncio.gather(_send_log(), _dm_owner(), return_exceptions=True)
+
+# ---------- Settings & panel embeds ----------
+_SETTINGS_FIELD_NAMES = ("Title", "Description", "Buttons", "Log Channel", "Notify Role", "Autoclose (hours)")
+
+def _build_settings_embed(cfg: dict) -> Embed:
+    values = (
+        cfg.get("title") or "—",
+        # setters cap new text at TEXT_MAX; the slice only guards older, longer configs
+        (cfg.get("description") or "—")[:1024],
+        ", ".join(cfg.get("buttons") or ()) or "—",
+        str(cfg.get("log_channel_id") or "None"),
+        str(cfg.get("notify_role_id") or "None"),
+        str(cfg.get("autoclose_hours", 0)),
+    )
+    embed = Embed.from_dict({
+        "title": "Ticket Settings",
+        "color": _CLR_BLURPLE.value,
+        "fields": [{"name": n, "value": v, "inline": False} for n, v in zip(_SETTINGS_FIELD_NAMES, values)],
+    })
+    embed.timestamp = discord.utils.utcnow()
+    return embed
+
+# the panel embed only changes with title/description/image, so keep the last one built;
+# any setter that changes those produces a new signature, which rebuilds it
+_panel_embed_cache = {"sig": None, "embed": None}
+
+def _build_panel_embed(cfg: dict) -> Embed:
+    # the public panel, shared by the preview and both send paths
+    sig = (cfg.get("title"), cfg.get("description"), cfg.get("image"))
+    if _panel_embed_cache["sig"] != sig:
+        payload = {"title": sig[0], "description": f"{sig[1]}\n\nMade by Max ❤️", "color": _CLR_DGRAY.value}
+        if sig[2]:
+            payload["thumbnail"] = {"url": sig[2]}
+        _panel_embed_cache["embed"] = Embed.from_dict(payload)
+        _panel_embed_cache["sig"] = sig
+    return _panel_embed_cache["embed"]
 
 # ---------- Setup: use modals if available, else provide slash commands for settings ----------
+# description / creation text cap, shared by the modals and the fallback setters;
+# it also keeps the settings embed under Discord's 1024-char field limit
+TEXT_MAX = 500
+
+def _clean(s: str, limit: int = TEXT_MAX) -> str:
+    # slash-command text is usually unpadded, so only strip when there is edge whitespace
+    if s and (s[0].isspace() or s[-1].isspace()):
+        s = s.strip()
+    return s[:limit]
+
 MODAL_AVAILABLE = TextInput is not None
 print("MODAL_AVAILABLE:", MODAL_AVAILABLE)
 
@@ -382,10 +772,10 @@ if MODAL_AVAILABLE:
     class SetTitleModal(Modal):
         def __init__(self):
             super().__init__(title="Set Panel Title", custom_id="modal_set_title")
-            self.input = TextInput(label="Panel Title", placeholder=_config.get("title") or DEFAULT_CONFIG["title"], required=True, max_length=100)
+            self.input = TextInput(label="Panel Title", placeholder=_PLACEHOLDERS["title"], required=True, max_length=100)
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
-            cfg = load_config(); cfg["title"] = self.input.value.strip(); save_config(cfg)
+            await update_config(title=self.input.value.strip())
             await interaction.response.send_message("Panel title updated.", ephemeral=True)
 
     class SetDescriptionModal(Modal):
@@ -393,12 +783,12 @@ if MODAL_AVAILABLE:
             super().__init__(title="Set Panel Description", custom_id="modal_set_description")
             style = TextStyle.paragraph if TextStyle is not None else None
             if style is not None:
-                self.input = TextInput(label="Panel description", placeholder="submit your suggestions here", style=style, required=True, max_length=500)
+                self.input = TextInput(label="Panel description", placeholder="submit your suggestions here", style=style, required=True, max_length=TEXT_MAX)
             else:
-                self.input = TextInput(label="Panel description", placeholder="submit your suggestions here", required=True, max_length=500)
+                self.input = TextInput(label="Panel description", placeholder="submit your suggestions here", required=True, max_length=TEXT_MAX)
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
-            cfg = load_config(); cfg["description"] = self.input.value.strip(); save_config(cfg)
+            await update_config(description=self.input.value.strip())
             await interaction.response.send_message("Panel description updated.", ephemeral=True)
 
     class SetImageModal(Modal):
@@ -408,9 +798,9 @@ if MODAL_AVAILABLE:
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
             v = self.input.value.strip()
-            if v and not (v.startswith("http://") or v.startswith("https://")):
+            if v and not v.startswith(("http://", "https://")):
                 await interaction.response.send_message("Invalid URL. Must begin with http:// or https://", ephemeral=True); return
-            cfg = load_config(); cfg["image"] = v or None; save_config(cfg)
+            await update_config(image=v or None)
             await interaction.response.send_message("Panel image updated.", ephemeral=True)
 
     class SetButtonsModal(Modal):
@@ -419,16 +809,16 @@ if MODAL_AVAILABLE:
             self.input = TextInput(label="Buttons (comma separated)", placeholder="Hosting, Issues, Suspension, Other", required=True, max_length=300)
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
-            labels = [s.strip() for s in self.input.value.split(",") if s.strip()]
+            labels = list(filter(None, (s.strip() for s in self.input.value.split(","))))
             if not labels:
                 await interaction.response.send_message("Provide at least one button label.", ephemeral=True); return
-            cfg = load_config(); cfg["buttons"] = labels; save_config(cfg)
+            await update_config(buttons=tuple(labels))
             await interaction.response.send_message(f"Buttons updated: {', '.join(labels)}", ephemeral=True)
 
     class SetCategoryModal(Modal):
         def __init__(self):
             super().__init__(title="Set Ticket Category ID", custom_id="modal_set_category")
-            self.input = TextInput(label="Category ID (0 to clear)", placeholder=str(_config.get("category_id") or "0"), required=True, max_length=30)
+            self.input = TextInput(label="Category ID (0 to clear)", placeholder=_PLACEHOLDERS["category_id"], required=True, max_length=30)
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
             v = self.input.value.strip()
@@ -436,15 +826,13 @@ if MODAL_AVAILABLE:
                 cid = int(v)
             except Exception:
                 await interaction.response.send_message("Category ID must be numeric (or 0).", ephemeral=True); return
-            cfg = load_config()
-            cfg["category_id"] = None if cid == 0 else cid
-            save_config(cfg)
+            await update_config(category_id=None if cid == 0 else cid)
             await interaction.response.send_message("Ticket category updated.", ephemeral=True)
 
     class SetLogChannelModal(Modal):
         def __init__(self):
             super().__init__(title="Set Log Channel ID", custom_id="modal_set_log")
-            self.input = TextInput(label="Log Channel ID (0 to disable)", placeholder=str(_config.get("log_channel_id") or "0"), required=True, max_length=30)
+            self.input = TextInput(label="Log Channel ID (0 to disable)", placeholder=_PLACEHOLDERS["log_channel_id"], required=True, max_length=30)
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
             v = self.input.value.strip()
@@ -452,7 +840,7 @@ if MODAL_AVAILABLE:
                 cid = int(v)
             except Exception:
                 await interaction.response.send_message("Channel ID must be numeric or 0.", ephemeral=True); return
-            cfg = load_config(); cfg["log_channel_id"] = None if cid == 0 else cid; save_config(cfg)
+            await update_config(log_channel_id=None if cid == 0 else cid)
             await interaction.response.send_message("Log channel updated.", ephemeral=True)
 
     class SetNotifyRoleModal(Modal):
@@ -463,7 +851,7 @@ if MODAL_AVAILABLE:
         async def callback(self, interaction: discord.Interaction):
             v = self.input.value.strip()
             if v == "0":
-                cfg = load_config(); cfg["notify_role_id"] = None; save_config(cfg); await interaction.response.send_message("Notify role disabled.", ephemeral=True); return
+                await update_config(notify_role_id=None); await interaction.response.send_message("Notify role disabled.", ephemeral=True); return
             rid = None
             if v.isdigit(): rid = int(v)
             elif v.startswith("<@&") and v.endswith(">"):
@@ -471,7 +859,7 @@ if MODAL_AVAILABLE:
                 except Exception: rid = None
             if rid is None:
                 await interaction.response.send_message("Provide role ID or mention like <@&123...> or 0 to disable.", ephemeral=True); return
-            cfg = load_config(); cfg["notify_role_id"] = rid; save_config(cfg)
+            await update_config(notify_role_id=rid)
             await interaction.response.send_message("Notify role updated.", ephemeral=True)
 
     class SetCreationTextModal(Modal):
@@ -479,67 +867,66 @@ if MODAL_AVAILABLE:
             super().__init__(title="Set Text Sent When Ticket Is Made", custom_id="modal_set_creation")
             style = TextStyle.paragraph if TextStyle is not None else None
             if style is not None:
-                self.input = TextInput(label="Text shown when ticket created", placeholder=_config.get("creation_text") or DEFAULT_CONFIG["creation_text"], style=style, required=True, max_length=500)
+                self.input = TextInput(label="Text shown when ticket created", placeholder=_PLACEHOLDERS["creation_text"], style=style, required=True, max_length=TEXT_MAX)
             else:
-                self.input = TextInput(label="Text shown when ticket created", placeholder=_config.get("creation_text") or DEFAULT_CONFIG["creation_text"], required=True, max_length=500)
+                self.input = TextInput(label="Text shown when ticket created", placeholder=_PLACEHOLDERS["creation_text"], required=True, max_length=TEXT_MAX)
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
-            cfg = load_config(); cfg["creation_text"] = self.input.value.strip(); save_config(cfg)
+            await update_config(creation_text=self.input.value.strip())
             await interaction.response.send_message("Creation text updated.", ephemeral=True)
 
     class SetAutocloseModal(Modal):
         def __init__(self):
             super().__init__(title="Set Autoclose Hours", custom_id="modal_set_autoclose")
-            self.input = TextInput(label="Hours (0 to disable)", placeholder=str(_config.get("autoclose_hours") or 0), required=True, max_length=6)
+            self.input = TextInput(label="Hours (0 to disable)", placeholder=_PLACEHOLDERS["autoclose_hours"], required=True, max_length=6)
             self.add_item(self.input)
         async def callback(self, interaction: discord.Interaction):
             try:
                 hours = int(self.input.value.strip())
             except Exception:
                 await interaction.response.send_message("Provide a valid number (0 to disable).", ephemeral=True); return
-            cfg = load_config(); cfg["autoclose_hours"] = max(0, hours); save_config(cfg)
+            await update_config(autoclose_hours=max(0, hours))
             if hours == 0:
                 await interaction.response.send_message("Auto-close disabled.", ephemeral=True)
             else:
                 await interaction.response.send_message(f"Auto-close set to {hours} hours.", ephemeral=True)
 
+    # setup button custom_id -> modal it opens
+    _MODAL_MAP = {
+        "btn_title": SetTitleModal,
+        "btn_desc": SetDescriptionModal,
+        "btn_image": SetImageModal,
+        "btn_buttons": SetButtonsModal,
+        "btn_category": SetCategoryModal,
+        "btn_log": SetLogChannelModal,
+        "btn_notify": SetNotifyRoleModal,
+        "btn_creation_text": SetCreationTextModal,
+        "btn_autoclose": SetAutocloseModal,
+    }
+
     # Setup view using buttons that open modals
     class SetupButton(Button):
         def __init__(self, label: str, cid: str, style=discord.ButtonStyle.primary):
             super().__init__(label=label, custom_id=cid, style=style)
 
         async def callback(self, interaction: discord.Interaction):
-            if not is_admin(interaction.user):
+            if not is_admin(interaction):
                 await interaction.response.send_message("Admins only.", ephemeral=True); return
             cid = self.custom_id
-            if cid == "btn_title": await interaction.response.send_modal(SetTitleModal()); return
-            if cid == "btn_desc": await interaction.response.send_modal(SetDescriptionModal()); return
-            if cid == "btn_image": await interaction.response.send_modal(SetImageModal()); return
-            if cid == "btn_buttons": await interaction.response.send_modal(SetButtonsModal()); return
-            if cid == "btn_category": await interaction.response.send_modal(SetCategoryModal()); return
-            if cid == "btn_log": await interaction.response.send_modal(SetLogChannelModal()); return
-            if cid == "btn_notify": await interaction.response.send_modal(SetNotifyRoleModal()); return
-            if cid == "btn_creation_text": await interaction.response.send_modal(SetCreationTextModal()); return
-            if cid == "btn_autoclose": await interaction.response.send_modal(SetAutocloseModal()); return
+            modal_cls = _MODAL_MAP.get(cid)
+            if modal_cls is not None:
+                await interaction.response.send_modal(modal_cls()); return
             if cid == "btn_preview":
-                cfg = load_config()
-                embed = Embed(title=cfg.get("title"), description=f"{cfg.get('description')}\n\nMade by Max ❤️", color=discord.Color.dark_gray())
-                if cfg.get("image"):
-                    try: embed.set_thumbnail(url=cfg.get("image"))
-                    except Exception: pass
+                cfg = await aload_config()
+                embed = _build_panel_embed(cfg)
                 await interaction.response.send_message("Panel preview (ephemeral):", embed=embed, ephemeral=True); return
             if cid == "btn_send_panel":
-                cfg = load_config()
-                embed = Embed(title=cfg.get("title"), description=f"{cfg.get('description')}\n\nMade by Max ❤️", color=discord.Color.dark_gray())
-                if cfg.get("image"):
-                    try: embed.set_thumbnail(url=cfg.get("image"))
-                    except Exception: pass
-                view = TicketPanelView(buttons=cfg.get("buttons", DEFAULT_CONFIG["buttons"]))
+                cfg = await aload_config()
+                embed = _build_panel_embed(cfg)
+                view = panel_view(cfg.get("buttons") or _DEFAULT_BUTTONS)
                 try:
                     sent = await interaction.channel.send(embed=embed, view=view)
-                    cfg["panel_message_id"] = sent.id
-                    cfg["panel_channel_id"] = sent.channel.id
-                    save_config(cfg)
+                    await update_config(panel_message_id=sent.id, panel_channel_id=sent.channel.id)
                     await interaction.response.send_message("Ticket panel posted to this channel.", ephemeral=True)
                 except Exception as e:
                     await interaction.response.send_message(f"Failed to send panel: {e}", ephemeral=True)
@@ -565,113 +952,81 @@ if MODAL_AVAILABLE:
                 style = discord.ButtonStyle.primary if "Set" in label or "Preview" in label or "Send" in label else discord.ButtonStyle.secondary
                 self.add_item(SetupButton(label=label, cid=cid, style=style))
 
+    # Listener-only instance for setup buttons: never sent, so it keeps timeout=None. Sending a
+    # view stores it under the same (type, None, custom_id) keys and its timeout later deletes
+    # them, so the listener is re-added after every send as well as in on_ready.
+    _SETUP_LISTENER = None
+
+    def setup_listener() -> View:
+        global _SETUP_LISTENER
+        if _SETUP_LISTENER is None:
+            _SETUP_LISTENER = TicketSetupView()
+        return _SETUP_LISTENER
+
     # Register slash commands that open the SetupView (modals handle input)
-    if GUILD_IDS:
-        @bot.slash_command(guild_ids=GUILD_IDS, name="ticket_setup", description="Open ticket setup menu (admins only).")
-        async def ticket_setup_cmd(ctx: discord.ApplicationContext):
-            if not is_admin(ctx.author): await ctx.respond("Admins only.", ephemeral=True); return
-            await ctx.respond("Ticket setup — use the buttons to configure the panel.", view=TicketSetupView(), ephemeral=True)
-
-        @bot.slash_command(guild_ids=GUILD_IDS, name="ticket_settings", description="Show ticket settings (admins only).")
-        async def ticket_settings_cmd(ctx: discord.ApplicationContext):
-            if not is_admin(ctx.author): await ctx.respond("Admins only.", ephemeral=True); return
-            cfg = load_config()
-            embed = Embed(title="Ticket Settings", color=discord.Color.blurple(), timestamp=datetime.datetime.utcnow())
-            embed.add_field(name="Title", value=cfg.get("title") or "—", inline=False)
-            desc = cfg.get("description") or "—"
-            if len(desc) > 1000: desc = desc[:1000] + "..."
-            embed.add_field(name="Description", value=desc, inline=False)
-            embed.add_field(name="Buttons", value=", ".join(cfg.get("buttons", [])) or "—", inline=False)
-            embed.add_field(name="Log Channel", value=str(cfg.get("log_channel_id") or "None"), inline=False)
-            embed.add_field(name="Notify Role", value=str(cfg.get("notify_role_id") or "None"), inline=False)
-            embed.add_field(name="Autoclose (hours)", value=str(cfg.get("autoclose_hours", 0)), inline=False)
-            await ctx.respond(embed=embed, ephemeral=True)
-    else:
-        @bot.slash_command(name="ticket_setup", description="Open ticket setup menu (admins only).")
-        async def ticket_setup_cmd(ctx: discord.ApplicationContext):
-            if not is_admin(ctx.author): await ctx.respond("Admins only.", ephemeral=True); return
-            await ctx.respond("Ticket setup — use the buttons to configure the panel.", view=TicketSetupView(), ephemeral=True)
-
-        @bot.slash_command(name="ticket_settings", description="Show ticket settings (admins only).")
-        async def ticket_settings_cmd(ctx: discord.ApplicationContext):
-            if not is_admin(ctx.author): await ctx.respond("Admins only.", ephemeral=True); return
-            cfg = load_config()
-            embed = Embed(title="Ticket Settings", color=discord.Color.blurple(), timestamp=datetime.datetime.utcnow())
-            embed.add_field(name="Title", value=cfg.get("title") or "—", inline=False)
-            desc = cfg.get("description") or "—"
-            if len(desc) > 1000: desc = desc[:1000] + "..."
-            embed.add_field(name="Description", value=desc, inline=False)
-            embed.add_field(name="Buttons", value=", ".join(cfg.get("buttons", [])) or "—", inline=False)
-            embed.add_field(name="Log Channel", value=str(cfg.get("log_channel_id") or "None"), inline=False)
-            embed.add_field(name="Notify Role", value=str(cfg.get("notify_role_id") or "None"), inline=False)
-            embed.add_field(name="Autoclose (hours)", value=str(cfg.get("autoclose_hours", 0)), inline=False)
-            await ctx.respond(embed=embed, ephemeral=True)
+    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="ticket_setup", description="Open ticket setup menu (admins only).")
+    async def ticket_setup_cmd(ctx: discord.ApplicationContext):
+        if not is_admin(ctx.interaction): await _ack(ctx, "Admins only."); return
+        # fresh view per call: an ephemeral send gives the view a 15-minute timeout
+        await _ack(ctx, "Ticket setup — use the buttons to configure the panel.", view=TicketSetupView())
+        bot.add_view(setup_listener())  # take the button keys back from the view just sent
+
+    # /ticket_settings is registered once below for both flows
 
 # If modals are unavailable, provide slash commands to set config (fallback)
 else:
     print("Modal support not available in this environment. Providing command-based fallback for settings.")
     # Provide commands such as /set_title, /set_description, etc.
     # These commands allow you to configure everything without modals.
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_title", description="Set the ticket panel title (admins only).")
-    async def set_title(ctx: discord.ApplicationContext, title: str):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config(); cfg["title"] = title.strip(); save_config(cfg)
-        await ctx.respond("Panel title updated.", ephemeral=True)
-
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_description", description="Set the ticket panel description (admins only).")
-    async def set_description(ctx: discord.ApplicationContext, *, description: str):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config(); cfg["description"] = description.strip(); save_config(cfg)
-        await ctx.respond("Panel description updated.", ephemeral=True)
-
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_image", description="Set panel image URL (admins only).")
-    async def set_image(ctx: discord.ApplicationContext, image_url: str):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        if image_url and not (image_url.startswith("http://") or image_url.startswith("https://")):
-            await ctx.respond("Invalid URL. Must start with http:// or https://", ephemeral=True); return
-        cfg = load_config(); cfg["image"] = image_url or None; save_config(cfg)
-        await ctx.respond("Panel image updated.", ephemeral=True)
-
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_buttons", description="Set panel buttons (comma separated) (admins only).")
-    async def set_buttons(ctx: discord.ApplicationContext, *, buttons: str):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        labels = [s.strip() for s in buttons.split(",") if s.strip()]
+    # parsers return the value to store, or raise ValueError with the message to show
+    def _parse_image(v: str):
+        v = _clean(v, 2048)
+        if v and not v.startswith(("http://", "https://")):
+            raise ValueError("Invalid URL. Must start with http:// or https://")
+        return v or None
+
+    def _parse_buttons(v: str):
+        labels = tuple(filter(None, (s.strip() for s in v.split(","))))
         if not labels:
-            await ctx.respond("Provide at least one label.", ephemeral=True); return
-        cfg = load_config(); cfg["buttons"] = labels; save_config(cfg)
-        await ctx.respond(f"Buttons updated: {', '.join(labels)}", ephemeral=True)
-
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_log", description="Set log channel ID (0 to disable) (admins only).")
-    async def set_log(ctx: discord.ApplicationContext, channel_id: int):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config(); cfg["log_channel_id"] = None if channel_id == 0 else channel_id; save_config(cfg)
-        await ctx.respond("Log channel updated.", ephemeral=True)
-
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_notify_role", description="Set notify role (ID) (admins only).")
-    async def set_notify_role(ctx: discord.ApplicationContext, role_id: int):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config(); cfg["notify_role_id"] = None if role_id == 0 else role_id; save_config(cfg)
-        await ctx.respond("Notify role updated.", ephemeral=True)
-
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_creation_text", description="Set text shown when ticket is created (admins only).")
-    async def set_creation_text(ctx: discord.ApplicationContext, *, text: str):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config(); cfg["creation_text"] = text.strip(); save_config(cfg)
-        await ctx.respond("Creation text updated.", ephemeral=True)
-
-    @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="set_autoclose", description="Set auto-close hours (0 disables) (admins only).")
-    async def set_autoclose(ctx: discord.ApplicationContext, hours: int):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config(); cfg["autoclose_hours"] = max(0, hours); save_config(cfg)
-        await ctx.respond(f"Autoclose set to {hours} hours.", ephemeral=True)
+            raise ValueError("Provide at least one label.")
+        return labels
+
+    # (command, option name, option type, config key, parser, description, reply)
+    _SETTERS = (
+        ("set_title", "title", str, "title", lambda v: _clean(v, 256),
+         "Set the ticket panel title (admins only).", "Panel title updated."),
+        ("set_description", "description", str, "description", _clean,
+         "Set the ticket panel description (admins only).", "Panel description updated."),
+        ("set_image", "image_url", str, "image", _parse_image,
+         "Set panel image URL (admins only).", "Panel image updated."),
+        ("set_buttons", "buttons", str, "buttons", _parse_buttons,
+         "Set panel buttons (comma separated) (admins only).", lambda v: f"Buttons updated: {', '.join(v)}"),
+        ("set_log", "channel_id", int, "log_channel_id", lambda v: None if v == 0 else v,
+         "Set log channel ID (0 to disable) (admins only).", "Log channel updated."),
+        ("set_notify_role", "role_id", int, "notify_role_id", lambda v: None if v == 0 else v,
+         "Set notify role (ID) (admins only).", "Notify role updated."),
+        ("set_creation_text", "text", str, "creation_text", _clean,
+         "Set text shown when ticket is created (admins only).", "Creation text updated."),
+        ("set_autoclose", "hours", int, "autoclose_hours", lambda v: max(0, v),
+         "Set auto-close hours (0 disables) (admins only).", lambda v: f"Autoclose set to {v} hours."),
+    )
+
+    def _make_setter(name, opt, opt_type, key, parse, description, reply):
+        @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name=name, description=description)
+        @discord.option(opt, opt_type, parameter_name="value")
+        async def _setter(ctx: discord.ApplicationContext, value):
+            if not is_admin(ctx.interaction):
+                await _ack(ctx, "Admins only."); return
+            try:
+                value = parse(value)
+            except ValueError as e:
+                await _ack(ctx, str(e)); return
+            await update_config(**{key: value})
+            await _ack(ctx, reply(value) if callable(reply) else reply)
+        return _setter
+
+    for _spec in _SETTERS:
+        _make_setter(*_spec)
 
     # Provide basic setup panel that only shows preview and send (since we don't have modals)
     class FallbackSetupView(View):
@@ -685,75 +1040,98 @@ else:
 
     @bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="ticket_setup", description="Open ticket setup (limited fallback).")
     async def ticket_setup_fallback(ctx: discord.ApplicationContext):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        await ctx.respond("Fallback setup — use slash commands to configure, or preview/send the panel here.", view=FallbackSetupView(), ephemeral=True)
+        if not is_admin(ctx.interaction):
+            await _ack(ctx, "Admins only."); return
+        await _ack(ctx, "Fallback setup — use slash commands to configure, or preview/send the panel here.", view=FallbackSetupView())
 
 # ---------- Common slash commands available in both flows ----------
 # settings command (show current config)
-if GUILD_IDS:
-    @bot.slash_command(guild_ids=GUILD_IDS, name="ticket_settings", description="Show ticket settings (admins only).")
-    async def ticket_settings(ctx: discord.ApplicationContext):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config()
-        embed = Embed(title="Ticket Settings", color=discord.Color.blurple(), timestamp=datetime.datetime.utcnow())
-        embed.add_field(name="Title", value=cfg.get("title") or "—", inline=False)
-        desc = cfg.get("description") or "—"
-        if len(desc) > 1000: desc = desc[:1000] + "..."
-        embed.add_field(name="Description", value=desc, inline=False)
-        embed.add_field(name="Buttons", value=", ".join(cfg.get("buttons", [])) or "—", inline=False)
-        embed.add_field(name="Log Channel", value=str(cfg.get("log_channel_id") or "None"), inline=False)
-        embed.add_field(name="Notify Role", value=str(cfg.get("notify_role_id") or "None"), inline=False)
-        embed.add_field(name="Autoclose (hours)", value=str(cfg.get("autoclose_hours", 0)), inline=False)
-        await ctx.respond(embed=embed, ephemeral=True)
-else:
-    @bot.slash_command(name="ticket_settings", description="Show ticket settings (admins only).")
-    async def ticket_settings(ctx: discord.ApplicationContext):
-        if not is_admin(ctx.author):
-            await ctx.respond("Admins only.", ephemeral=True); return
-        cfg = load_config()
-        embed = Embed(title="Ticket Settings", color=discord.Color.blurple(), timestamp=datetime.datetime.utcnow())
-        embed.add_field(name="Title", value=cfg.get("title") or "—", inline=False)
-        desc = cfg.get("description") or "—"
-        if len(desc) > 1000: desc = desc[:1000] + "..."
-        embed.add_field(name="Description", value=desc, inline=False)
-        embed.add_field(name="Buttons", value=", ".join(cfg.get("buttons", [])) or "—", inline=False)
-        embed.add_field(name="Log Channel", value=str(cfg.get("log_channel_id") or "None"), inline=False)
-        embed.add_field(name="Notify Role", value=str(cfg.get("notify_role_id") or "None"), inline=False)
-        embed.add_field(name="Autoclose (hours)", value=str(cfg.get("autoclose_hours", 0)), inline=False)
-        await ctx.respond(embed=embed, ephemeral=True)
+@bot.slash_command(guild_ids=GUILD_IDS if GUILD_IDS else None, name="ticket_settings", description="Show ticket settings (admins only).")
+async def ticket_settings(ctx: discord.ApplicationContext):
+    if not is_admin(ctx.interaction):
+        await _ack(ctx, "Admins only."); return
+    await _ack(ctx, embed=_build_settings_embed(await aload_config()))
 
 # ---------- Setup panel send helper ----------
 @bot.slash_command(name="send_ticket_panel", description="Post the ticket panel in the current channel (admins only).", guild_ids=GUILD_IDS if GUILD_IDS else None)
 async def send_ticket_panel(ctx: discord.ApplicationContext):
-    if not is_admin(ctx.author):
-        await ctx.respond("Admins only.", ephemeral=True); return
-    cfg = load_config()
-    embed = Embed(title=cfg.get("title"), description=f"{cfg.get('description')}\n\nMade by Max ❤️", color=discord.Color.dark_gray())
-    if cfg.get("image"):
-        try: embed.set_thumbnail(url=cfg.get("image"))
-        except Exception: pass
-    view = TicketPanelView(buttons=cfg.get("buttons", DEFAULT_CONFIG["buttons"]))
+    if not is_admin(ctx.interaction):
+        await _ack(ctx, "Admins only."); return
+    cfg = await aload_config()
+    embed = _build_panel_embed(cfg)
+    view = panel_view(cfg.get("buttons") or _DEFAULT_BUTTONS)
     try:
         sent = await ctx.channel.send(embed=embed, view=view)
-        cfg["panel_message_id"] = sent.id
-        cfg["panel_channel_id"] = sent.channel.id
-        save_config(cfg)
-        await ctx.respond("Ticket panel posted.", ephemeral=True)
+        await update_config(panel_message_id=sent.id, panel_channel_id=sent.channel.id)
+        await _ack(ctx, "Ticket panel posted.")
     except Exception as e:
-        await ctx.respond(f"Failed to post panel: {e}", ephemeral=True)
+        await _ack(ctx, f"Failed to post panel: {e}")
 
 # ---------- on_ready ----------
 @bot.event
 async def on_ready():
+    global _autoclose_task
     print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
-    bot.loop.create_task(auto_close_checker())
+    index_open_tickets()
+    track_ticket_channels()
+    # pay the role scan now rather than on the first ticket of each guild; drop what we had
+    # first, since role events missed while disconnected would leave it stale
+    for guild in bot.guilds:
+        invalidate_role_caches(guild.id)
+        base_overwrites(guild)
+    # re-attach button handlers to panels and tickets posted before this process started
+    bot.add_view(make_close_view())
+    if MODAL_AVAILABLE:
+        bot.add_view(setup_listener())
+    cfg = await aload_config()
+    # unbound (message_id None): the custom_ids are stable, so clicks on every posted panel route here
+    bot.add_view(panel_view(cfg.get("buttons") or _DEFAULT_BUTTONS))
+    start_config_flusher()
+    # on_ready fires again after reconnects; keep a single checker loop
+    if _autoclose_task is None or _autoclose_task.done():
+        _autoclose_task = asyncio.create_task(auto_close_checker())
+
+# ---------- Ticket activity ----------
+@bot.event
+async def on_message(message: discord.Message):
+    ch = message.channel
+    if isinstance(ch, discord.TextChannel) and ch.name.startswith("ticket-"):
+        if ch.id in _CLOSING and message.author == bot.user:
+            return
+        touch_ticket(ch.id, message.created_at.timestamp())
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    # covers tickets deleted by hand, outside the close paths
+    tickets = OPEN_TICKETS.get(channel.guild.id)
+    if tickets:
+        owner_id = topic_owner_id(getattr(channel, "topic", None))
+        if tickets.get(owner_id) == channel.id:
+            del tickets[owner_id]
+    _LAST_ACTIVITY.pop(channel.id, None)
+
+# ---------- Role cache invalidation ----------
+@bot.event
+async def on_guild_available(guild: discord.Guild):
+    # guilds that come back after an outage may have missed role events; rebuild from scratch
+    invalidate_role_caches(guild.id)
+    base_overwrites(guild)
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    invalidate_role_caches(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    invalidate_role_caches(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    invalidate_role_caches(role.guild.id)
 
 # ---------- Run ----------
 if __name__ == "__main__":
-    TOKEN = os.getenv("DISCORD_TOKEN")
-    if not TOKEN:
-        raise RuntimeError("DISCORD_TOKEN not set in environment.")
+    # bind the keep-alive port right away instead of waiting for the gateway to be ready
+    bot.loop.create_task(start_web())
     # start bot
     bot.run(TOKEN)